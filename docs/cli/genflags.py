@@ -34,11 +34,10 @@ parser.add_argument('-c', '--config', help='Path to configuration file')
 main.add_all_arguments(parser)
 
 
-def width(key):
-    return max(map(lambda f: len(f[key]), parser.flags))
-
-wn = width('name')
-wd = width('description')
+wn = wd = 0
+for flag in parser.flags:
+    wn = max(wn, len(flag['name']))
+    wd = max(wd, len(flag['description']))
 
 print("""..
     Do not modify this file. This file is generated by genflags.py.\n""")
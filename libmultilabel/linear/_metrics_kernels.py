@@ -0,0 +1,73 @@
+import numpy as np
+from numba import njit, prange
+
+
+@njit(parallel=True, cache=True)
+def rprecision_kernel(preds, target, top_k):
+    """Compute the sum of R-precision@k scores of a batch.
+
+    Each row keeps the k largest decision values in a min-heap while scanning
+    the row once, so the top-k indices are never materialized for the whole batch.
+    Ties are broken in favor of the smaller label index: among equal values the
+    heap root is the largest index, and a later label with an equal value is
+    not inserted.
+
+    Args:
+        preds (np.ndarray): C-contiguous decision values of shape (batch_size, num_classes).
+        target (np.ndarray): A 0/1 matrix of shape (batch_size, num_classes).
+        top_k (int): The number of top predictions to evaluate.
+
+    Returns:
+        tuple[float, int]: The sum of scores and the number of samples in the batch.
+    """
+    num_sample, num_classes = preds.shape
+    scores = np.zeros(num_sample)
+    for i in prange(num_sample):
+        heap_vals = np.empty(top_k)
+        heap_idx = np.empty(top_k, dtype=np.intp)
+        size = 0
+        for j in range(num_classes):
+            v = preds[i, j]
+            if size < top_k:
+                # sift up the new value
+                pos = size
+                size += 1
+                while pos > 0:
+                    parent = (pos - 1) >> 1
+                    if heap_vals[parent] < v:
+                        break
+                    heap_vals[pos] = heap_vals[parent]
+                    heap_idx[pos] = heap_idx[parent]
+                    pos = parent
+                heap_vals[pos] = v
+                heap_idx[pos] = j
+            elif v > heap_vals[0]:
+                # replace the smallest value and sift it down
+                pos = 0
+                while True:
+                    child = 2 * pos + 1
+                    if child >= top_k:
+                        break
+                    if child + 1 < top_k and (
+                            heap_vals[child + 1] < heap_vals[child]
+                            or (heap_vals[child + 1] == heap_vals[child]
+                                and heap_idx[child + 1] > heap_idx[child])):
+                        child += 1
+                    if heap_vals[child] >= v:
+                        break
+                    heap_vals[pos] = heap_vals[child]
+                    heap_idx[pos] = heap_idx[child]
+                    pos = child
+                heap_vals[pos] = v
+                heap_idx[pos] = j
+
+        num_relevant = 0.
+        for h in range(size):
+            num_relevant += target[i, heap_idx[h]]
+        target_sum = 0.
+        for j in range(num_classes):
+            target_sum += target[i, j]
+        denom = min(top_k, target_sum)
+        if denom > 0:
+            scores[i] = num_relevant / denom
+    return scores.sum(), num_sample
@@ -1,7 +1,13 @@
+import os
 import re
+import sys
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
+from ._metrics_kernels import rprecision_kernel
+
 __all__ = ['RPrecision',
            'Precision',
            'F1',
@@ -9,6 +15,61 @@ __all__ = ['RPrecision',
            'get_metrics',
            'tabulate_metrics']
 
+_P_RE = re.compile(r'P@(\d+)$')
+_RP_RE = re.compile(r'RP@(\d+)$')
+
+
+def _topk_indices(preds: np.ndarray, k: int, sort: bool = False) -> np.ndarray:
+    """Return the indices of the k largest values in each row.
+
+    Ties are broken in favor of the smaller label index, the same order as
+    `rprecision_kernel`, so a metric scores the same whichever path selects its
+    top k. If sort is True, the indices are ordered by decreasing value.
+    """
+    if k == 1:
+        return np.argmax(preds, axis=1)[:, None]
+    num_classes = preds.shape[1]
+    if k >= num_classes:
+        top_k_ind = np.broadcast_to(np.arange(num_classes), preds.shape).copy()
+    else:
+        # Partition at the (k+1)-th largest value, so the last k columns hold the
+        # top k. The top k is ambiguous only in rows where the k-th largest value
+        # equals the (k+1)-th, so the full row is scanned just for those rows.
+        partition = np.argpartition(preds, num_classes - k - 1, axis=1)
+        top_k_ind = partition[:, -k:]
+        next_val = np.take_along_axis(preds, partition[:, -k - 1:-k], axis=1)
+        kth = np.take_along_axis(preds, top_k_ind, axis=1).min(axis=1, keepdims=True)
+        tied_rows = np.flatnonzero(kth[:, 0] == next_val[:, 0])
+        if len(tied_rows) > 0:
+            sub, kth = preds[tied_rows], kth[tied_rows]
+            greater = sub > kth
+            equal = sub == kth
+            num_equal = k - np.count_nonzero(greater, axis=1)
+            selected = greater | (equal & (np.cumsum(equal, axis=1) <= num_equal[:, None]))
+            top_k_ind[tied_rows] = np.nonzero(selected)[1].reshape(-1, k)
+    if sort:
+        top_k_vals = np.take_along_axis(preds, top_k_ind, axis=1)
+        order = np.lexsort((top_k_ind, -top_k_vals), axis=1)
+        top_k_ind = np.take_along_axis(top_k_ind, order, axis=1)
+    return top_k_ind
+
+
+def _is_tensor(x) -> bool:
+    """Check whether x is a torch.Tensor without importing torch."""
+    torch = sys.modules.get('torch')
+    return torch is not None and isinstance(x, torch.Tensor)
+
+
+def _to_numpy(x) -> np.ndarray:
+    if _is_tensor(x):
+        return x.detach().cpu().numpy()
+    return x
+
+
+def _masked_divide(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """Element-wise num / den, with 0 where den is 0."""
+    return np.divide(num, den, out=np.zeros(num.shape, dtype=np.float64), where=den > 0)
+
 
 class RPrecision:
     def __init__(self, top_k: int) -> None:
@@ -16,19 +77,42 @@ class RPrecision:
         self.score = 0
         self.num_sample = 0
 
-    def update(self, preds: np.ndarray, target: np.ndarray) -> None:
+    def update(self, preds: np.ndarray, target: np.ndarray, top_k_ind: np.ndarray = None) -> None:
         assert preds.shape == target.shape  # (batch_size, num_classes)
-        top_k_ind = np.argpartition(preds, -self.top_k)[:, -self.top_k:]
-        num_relevant = np.take_along_axis(
-            target, top_k_ind, axis=-1).sum(axis=-1)  # (batch_size, top_k)
+        if _is_tensor(preds):
+            self._update_tensor(preds, target)
+            return
+
+        if not preds.flags['C_CONTIGUOUS']:
+            preds = np.ascontiguousarray(preds)
+        if top_k_ind is not None:
+            top_k_ind = top_k_ind[:, :self.top_k]
+        elif preds.dtype in (np.float32, np.float64):
+            score, num_sample = rprecision_kernel(preds, target, self.top_k)
+            self.score += score
+            self.num_sample += num_sample
+            return
+        else:
+            top_k_ind = _topk_indices(preds, self.top_k)
+        row_idx = np.arange(preds.shape[0], dtype=np.intp)[:, None]
+        num_relevant = target[row_idx, top_k_ind].sum(axis=-1)  # (batch_size,)
+        target_sum = target.sum(axis=-1)
         self.score += np.nan_to_num(
-            num_relevant / np.minimum(self.top_k, target.sum(axis=-1)),
+            num_relevant / np.minimum(self.top_k, target_sum),
             posinf=0.
         ).sum()
         self.num_sample += preds.shape[0]
 
+    def _update_tensor(self, preds, target) -> None:
+        # Keep the batch on its device; the score is synchronized in compute().
+        top_k_ind = preds.topk(self.top_k, dim=1).indices
+        num_relevant = target.gather(1, top_k_ind).sum(dim=1).double()
+        self.score += (num_relevant / target.sum(dim=1).clamp(max=self.top_k)
+                       ).nan_to_num(posinf=0.).sum()
+        self.num_sample += preds.shape[0]
+
     def compute(self) -> float:
-        return self.score / self.num_sample
+        return float(self.score) / self.num_sample
 
 
 class Precision:
@@ -37,15 +121,27 @@ class Precision:
         self.score = 0
         self.num_sample = 0
 
-    def update(self, preds: np.ndarray, target: np.ndarray) -> None:
+    def update(self, preds: np.ndarray, target: np.ndarray, top_k_ind: np.ndarray = None) -> None:
         assert preds.shape == target.shape  # (batch_size, num_classes)
-        top_k_ind = np.argpartition(preds, -self.top_k)[:, -self.top_k:]
-        num_relevant = np.take_along_axis(target, top_k_ind, -1).sum()
+        if _is_tensor(preds):
+            top_k_ind = preds.topk(self.top_k, dim=1).indices
+            self.score += target.gather(1, top_k_ind).sum().double() / self.top_k
+            self.num_sample += preds.shape[0]
+            return
+
+        if not preds.flags['C_CONTIGUOUS']:
+            preds = np.ascontiguousarray(preds)
+        if top_k_ind is not None:
+            top_k_ind = top_k_ind[:, :self.top_k]
+        else:
+            top_k_ind = _topk_indices(preds, self.top_k)
+        row_idx = np.arange(preds.shape[0], dtype=np.intp)[:, None]
+        num_relevant = target[row_idx, top_k_ind].sum()
         self.score += num_relevant / self.top_k
         self.num_sample += preds.shape[0]
 
     def compute(self) -> float:
-        return self.score / self.num_sample
+        return float(self.score) / self.num_sample
 
 
 class F1:
@@ -55,44 +151,133 @@ class F1:
         if average not in {'macro', 'micro', 'another-macro'}:
             raise ValueError('unsupported average')
         self.average = average
-        self.tp = self.fp = self.fn = 0
+        # per-class counts are bounded by the number of samples, so 32 bits suffice
+        self.tp = np.zeros(num_classes, dtype=np.uint32)
+        self.fp = np.zeros(num_classes, dtype=np.uint32)
+        self.fn = np.zeros(num_classes, dtype=np.uint32)
 
-    def update(self, preds: np.ndarray, target: np.ndarray) -> None:
+    def update(self, preds: np.ndarray, target: np.ndarray, binary_preds: np.ndarray = None) -> None:
         assert preds.shape == target.shape  # (batch_size, num_classes)
-        preds = preds > self.metric_threshold
-        self.tp += np.logical_and(target == 1, preds == 1).sum(axis=0)
-        self.fn += np.logical_and(target == 1, preds == 0).sum(axis=0)
-        self.fp += np.logical_and(target == 0, preds == 1).sum(axis=0)
+        if binary_preds is None:
+            binary_preds = preds > self.metric_threshold
+        if _is_tensor(binary_preds):
+            self._update_tensor(binary_preds, target)
+            return
+
+        if np.count_nonzero(target) < 0.01 * target.size:
+            # Targets of extreme multi-label data are very sparse, so count the
+            # per-class positives from the nonzero entries only.
+            rows, cols = np.nonzero(target)
+            tp = np.bincount(cols[binary_preds[rows, cols]], minlength=self.num_classes)
+            actual_pos = np.bincount(cols, minlength=self.num_classes)
+        else:
+            target = target.astype(bool, copy=False)
+            # sum 0/1 masks as uint8, which uses the integer reduction loop
+            tp = (binary_preds & target).view(np.uint8).sum(axis=0, dtype=np.uint32)
+            actual_pos = target.view(np.uint8).sum(axis=0, dtype=np.uint32)
+        pred_pos = binary_preds.view(np.uint8).sum(axis=0, dtype=np.uint32)
+        np.add(self.tp, tp, out=self.tp, casting='unsafe')
+        np.add(self.fp, pred_pos - tp, out=self.fp, casting='unsafe')
+        np.add(self.fn, actual_pos - tp, out=self.fn, casting='unsafe')
+
+    def _update_tensor(self, binary_preds, target) -> None:
+        # Keep the counters on the device of the batch; they are copied back in compute().
+        target = target.bool()
+        tp = (binary_preds & target).sum(dim=0)
+        if not _is_tensor(self.tp):
+            self.tp, self.fp, self.fn = (tp.new_tensor(x.astype(np.int64))
+                                         for x in (self.tp, self.fp, self.fn))
+        self.tp += tp
+        self.fp += binary_preds.sum(dim=0) - tp
+        self.fn += target.sum(dim=0) - tp
 
     def compute(self) -> float:
-        prev_settings = np.seterr('ignore')
+        tp = _to_numpy(self.tp).astype(np.float64)
+        fp = _to_numpy(self.fp).astype(np.float64)
+        fn = _to_numpy(self.fn).astype(np.float64)
 
         if self.average == 'macro':
-            score = np.nansum(
-                2*self.tp / (2*self.tp + self.fp + self.fn)) / self.num_classes
+            score = _masked_divide(
+                2*tp, 2*tp + fp + fn).sum() / self.num_classes
         elif self.average == 'micro':
-            score = np.nan_to_num(2*np.sum(self.tp) /
-                                  np.sum(2*self.tp + self.fp + self.fn))
+            num = 2*np.sum(tp)
+            den = np.sum(2*tp + fp + fn)
+            score = num / den if den > 0 else 0.
         elif self.average == 'another-macro':
-            macro_prec = np.nansum(
-                self.tp / (self.tp + self.fp)) / self.num_classes
-            macro_recall = np.nansum(
-                self.tp / (self.tp + self.fn)) / self.num_classes
-            score = np.nan_to_num(
-                2 * macro_prec * macro_recall / (macro_prec + macro_recall))
-
-        np.seterr(**prev_settings)
+            macro_prec = _masked_divide(
+                tp, tp + fp).sum() / self.num_classes
+            macro_recall = _masked_divide(
+                tp, tp + fn).sum() / self.num_classes
+            den = macro_prec + macro_recall
+            score = 2 * macro_prec * macro_recall / den if den > 0 else 0.
+
         return score
 
 
 class MetricCollection(dict):
-    def __init__(self, metrics) -> None:
+    def __init__(self, metrics, parallel_threshold: int = 2**20) -> None:
         self.metrics = metrics
+        # Metric updates are NumPy reductions that release the GIL, so batches with
+        # at least `parallel_threshold` entries are updated concurrently. Smaller
+        # batches run sequentially since thread dispatch would outweigh the work.
+        self.parallel_threshold = parallel_threshold
+        self._num_workers = min(len(metrics), os.cpu_count() or 1)
+        self._pool = None
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        # Create the workers on the first large batch, and stop them with the collection.
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._num_workers)
+            weakref.finalize(self, self._pool.shutdown, wait=False)
+        return self._pool
 
     def update(self, preds: np.ndarray, target: np.ndarray) -> None:
         assert preds.shape == target.shape  # (batch_size, num_classes)
+        # Row-wise top-k selections are much faster on row-major input. Copy a
+        # strided view once here rather than once in every top-k metric.
+        if not _is_tensor(preds) and not preds.flags['C_CONTIGUOUS']:
+            preds = np.ascontiguousarray(preds)
+
+        # Precision metrics share one top-k selection at the largest k. The
+        # indices are sorted by decision value so each metric can slice its own k.
+        top_ks = [metric.top_k for metric in self.metrics.values()
+                  if isinstance(metric, (Precision, RPrecision))]
+        top_k_ind = None
+        if len(top_ks) > 1 and max(top_ks) < preds.shape[1] and not _is_tensor(preds):
+            top_k_ind = _topk_indices(preds, max(top_ks), sort=True)
+
+        # F1 metrics with the same threshold share one thresholded prediction.
+        thresholds = [metric.metric_threshold for metric in self.metrics.values()
+                      if isinstance(metric, F1)]
+        binary_preds = {threshold: preds > threshold for threshold in set(thresholds)
+                        if thresholds.count(threshold) > 1}
+
+        updates = []
         for metric in self.metrics.values():
-            metric.update(preds, target)
+            if top_k_ind is not None and isinstance(metric, (Precision, RPrecision)):
+                updates.append((metric, {'top_k_ind': top_k_ind}))
+            elif isinstance(metric, F1) and metric.metric_threshold in binary_preds:
+                updates.append(
+                    (metric, {'binary_preds': binary_preds[metric.metric_threshold]}))
+            else:
+                updates.append((metric, {}))
+
+        if (self._num_workers > 1 and not _is_tensor(preds)
+                and preds.shape[0] * preds.shape[1] >= self.parallel_threshold):
+            pool = self._get_pool()
+            # RPrecision may launch the parallel Numba kernel, which deadlocks under
+            # Numba's TBB threading layer when called from a worker thread. Run it on
+            # the calling thread while the other metrics run in the pool.
+            futures = [pool.submit(metric.update, preds, target, **kwargs)
+                       for metric, kwargs in updates if not isinstance(metric, RPrecision)]
+            for metric, kwargs in updates:
+                if isinstance(metric, RPrecision):
+                    metric.update(preds, target, **kwargs)
+            for future in futures:
+                future.result()
+        else:
+            for metric, kwargs in updates:
+                metric.update(preds, target, **kwargs)
 
     def compute(self) -> "dict[str, float]":
         ret = {}
@@ -119,11 +304,13 @@ def get_metrics(metric_threshold: float, monitor_metrics: list, num_classes: int
         monitor_metrics = []
     metrics = {}
     for metric in monitor_metrics:
-        if re.match('P@\d+', metric):
+        match_p = _P_RE.match(metric)
+        match_rp = _RP_RE.match(metric)
+        if match_p:
             metrics[metric] = Precision(
-                num_classes, average='samples', top_k=int(metric[2:]))
-        elif re.match('RP@\d+', metric):
-            metrics[metric] = RPrecision(top_k=int(metric[3:]))
+                num_classes, average='samples', top_k=int(match_p.group(1)))
+        elif match_rp:
+            metrics[metric] = RPrecision(top_k=int(match_rp.group(1)))
         elif metric in {'Another-Macro-F1', 'Macro-F1', 'Micro-F1'}:
             metrics[metric] = F1(
                 num_classes, metric_threshold, average=metric[:-3].lower())
@@ -136,7 +323,7 @@ def get_metrics(metric_threshold: float, monitor_metrics: list, num_classes: int
 def tabulate_metrics(metric_dict, split):
     msg = f'====== {split} dataset evaluation result =======\n'
     header = '|'.join([f'{k:^18}' for k in metric_dict.keys()])
-    values = '|'.join([f'{x * 100:^18.4f}' if isinstance(x, (np.floating,
-                      float)) else f'{x:^18}' for x in metric_dict.values()])
+    scores = np.asarray(list(metric_dict.values()), dtype=float) * 100
+    values = '|'.join(map('{:^18.4f}'.format, scores.tolist()))
     msg += f"|{header}|\n|{'-----------------:|' * len(metric_dict)}\n|{values}|\n"
     return msg
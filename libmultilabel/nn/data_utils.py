@@ -10,7 +10,7 @@ import pandas as pd
 from nltk.tokenize import RegexpTokenizer
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MultiLabelBinarizer
-from torch.utils.data import Dataset
+from torch.utils.data import Dataset, Sampler
 from torch.nn.utils.rnn import pad_sequence
 from torchtext.vocab import build_vocab_from_iterator, pretrained_aliases
 from tqdm import tqdm
@@ -48,6 +48,45 @@ class TextDataset(Dataset):
         }
 
 
+class BucketedBatchSampler(Sampler):
+    """Batch sampler that groups samples of similar lengths to reduce padding.
+
+    The indices are split into buckets of `batch_size * bucket_batches` samples. Each bucket
+    is sorted by length and cut into batches, so a batch is only padded to the longest of
+    samples with close lengths. With `shuffle`, the indices are shuffled before bucketing
+    and the order of the batches is shuffled every epoch.
+
+    Args:
+        lengths (list): The number of tokens of each sample.
+        batch_size (int): Size of batches.
+        bucket_batches (int, optional): The number of batches in a bucket. Defaults to 100.
+        shuffle (bool, optional): Whether to shuffle the batches before each epoch. Defaults to True.
+    """
+
+    def __init__(self, lengths, batch_size, bucket_batches=100, shuffle=True):
+        self.lengths = torch.as_tensor(lengths)
+        self.batch_size = batch_size
+        self.bucket_size = batch_size * bucket_batches
+        self.shuffle = shuffle
+
+    def __iter__(self):
+        if self.shuffle:
+            indices = torch.randperm(len(self.lengths))
+        else:
+            indices = torch.arange(len(self.lengths))
+        batches = []
+        for bucket in indices.split(self.bucket_size):
+            bucket = bucket[self.lengths[bucket].sort(stable=True).indices]
+            batches += bucket.split(self.batch_size)
+        if self.shuffle:
+            batches = [batches[i] for i in torch.randperm(len(batches))]
+        for batch in batches:
+            yield batch.tolist()
+
+    def __len__(self):
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+
 def tokenize(text):
     """Tokenize text.
 
@@ -82,7 +121,8 @@ def get_dataset_loader(
     shuffle=False,
     data_workers=4,
     tokenizer=None,
-    add_special_tokens=False
+    add_special_tokens=False,
+    bucket_by_length=False
 ):
     """Create a pytorch DataLoader.
 
@@ -97,18 +137,27 @@ def get_dataset_loader(
         data_workers (int, optional): Use multi-cpu core for data pre-processing. Defaults to 4.
         tokenizer (optional): Tokenizer of the transformer-based language model. Defaults to None.
         add_special_tokens (bool, optional): Whether to add the special tokens. Defaults to False.
+        bucket_by_length (bool, optional): Whether to batch samples of similar lengths together with
+            `BucketedBatchSampler`. This changes the order of samples, so it is meant for training
+            only. Defaults to False.
 
     Returns:
         torch.utils.data.DataLoader: A pytorch DataLoader.
     """
     dataset = TextDataset(data, word_dict, classes, max_seq_length, tokenizer=tokenizer)
+    if bucket_by_length:
+        # Untokenized text (for transformers tokenizers) is approximated by its number of words.
+        lengths = [min(len(d['text'].split() if isinstance(d['text'], str) else d['text']), max_seq_length)
+                   for d in data]
+        loader_kwargs = {'batch_sampler': BucketedBatchSampler(lengths, batch_size, shuffle=shuffle)}
+    else:
+        loader_kwargs = {'batch_size': batch_size, 'shuffle': shuffle}
     dataset_loader = torch.utils.data.DataLoader(
         dataset,
-        batch_size=batch_size,
-        shuffle=shuffle,
         num_workers=data_workers,
         collate_fn=generate_batch,
         pin_memory='cuda' in device.type,
+        **loader_kwargs
     )
     return dataset_loader
 
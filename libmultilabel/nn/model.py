@@ -61,6 +61,18 @@ class MultiLabelModel(pl.LightningModule):
         """Return loss and predicted logits"""
         return NotImplemented
 
+    def transfer_batch_to_device(self, batch, device, dataloader_idx):
+        """Move a batch to the device except for `length`, which stays on CPU where
+        `pack_padded_sequence` consumes it. This avoids a device-to-host sync in
+        every forward of the RNN encoders.
+        """
+        batch = dict(batch)
+        length = batch.pop('length', None)
+        batch = super().transfer_batch_to_device(batch, device, dataloader_idx)
+        if length is not None:
+            batch['length'] = length
+        return batch
+
     def configure_optimizers(self):
         """Initialize an optimizer for the free parameters of the network.
         """
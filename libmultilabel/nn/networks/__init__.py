@@ -1,3 +1,4 @@
+import torch
 import torch.nn as nn
 
 from .bert import BERT
@@ -9,6 +10,7 @@ from .labelwise_attention_networks import BiGRULWAN
 from .labelwise_attention_networks import BiLSTMLWAN
 from .labelwise_attention_networks import BiLSTMLWMHAN
 from .labelwise_attention_networks import CNNLWAN
+from .modules import LabelwiseAttention, LabelwiseLinearOutput, LabelwiseMultiHeadAttention
 
 
 def get_init_weight_func(init_weight):
@@ -16,3 +18,28 @@ def get_init_weight_func(init_weight):
         if isinstance(m, nn.Linear) or isinstance(m, nn.Conv1d) or isinstance(m, nn.Conv2d):
             getattr(nn.init, init_weight+ '_')(m.weight)
     return init_weight_func
+
+
+def compile_label_heads(network, mode='reduce-overhead', dynamic=True):
+    """Compile the label-wise heads of a network in place with `torch.compile`.
+
+    `nn.Module.compile` keeps the parameter names and the module picklable,
+    so compiled networks still save to and load from checkpoints.
+    """
+    if not hasattr(nn.Module, 'compile'):
+        raise RuntimeError('compiling label-wise heads requires torch>=2.2')
+    for m in network.modules():
+        if isinstance(m, (LabelwiseAttention, LabelwiseMultiHeadAttention, LabelwiseLinearOutput)):
+            m.compile(mode=mode, dynamic=dynamic)
+
+
+def script_label_heads(network):
+    """Replace the label-wise heads of a network in place with TorchScript modules.
+
+    Scripted modules cannot be pickled into a checkpoint, so this is meant for
+    networks that are only used for evaluation or prediction afterwards.
+    """
+    for name, m in list(network.named_modules()):
+        if isinstance(m, (LabelwiseAttention, LabelwiseMultiHeadAttention, LabelwiseLinearOutput)):
+            parent_name, _, child_name = name.rpartition('.')
+            setattr(network.get_submodule(parent_name), child_name, torch.jit.script(m))
@@ -15,6 +15,8 @@ class KimCNN(nn.Module):
         embed_dropout (float): The dropout rate of the word embedding. Defaults to 0.2.
         encoder_dropout (float): The dropout rate of the encoder output. Defaults to 0.
         activation (str): Activation function to be used. Defaults to 'relu'.
+        freeze_embed (bool): Whether to keep the word embedding fixed during training. Defaults to False.
+        fuse_filters (bool): Whether to run all filter sizes as a single convolution. Defaults to False.
     """
     def __init__(
         self,
@@ -24,13 +26,16 @@ class KimCNN(nn.Module):
         num_filter_per_size=128,
         embed_dropout=0.2,
         encoder_dropout=0,
-        activation='relu'
+        activation='relu',
+        freeze_embed=False,
+        fuse_filters=False
     ):
         super(KimCNN, self).__init__()
-        self.embedding = Embedding(embed_vecs, embed_dropout)
+        self.embedding = Embedding(embed_vecs, embed_dropout, freeze_embed)
         self.encoder = CNNEncoder(embed_vecs.shape[1], filter_sizes,
                                   num_filter_per_size, activation,
-                                  encoder_dropout, num_pool=1)
+                                  encoder_dropout, num_pool=1,
+                                  fuse_filters=fuse_filters)
         conv_output_size = num_filter_per_size * len(filter_sizes)
         self.linear = nn.Linear(conv_output_size, num_classes)
 
@@ -14,11 +14,12 @@ class LabelwiseAttentionNetwork(ABC, nn.Module):
         embed_dropout (float): The dropout rate of the word embedding.
         encoder_dropout (float): The dropout rate of the encoder output.
         hidden_dim (int): The output dimension of the encoder.
+        freeze_embed (bool): Whether to keep the word embedding fixed during training. Defaults to False.
     """
 
-    def __init__(self, embed_vecs, num_classes, embed_dropout, encoder_dropout, hidden_dim):
+    def __init__(self, embed_vecs, num_classes, embed_dropout, encoder_dropout, hidden_dim, freeze_embed=False):
         super(LabelwiseAttentionNetwork, self).__init__()
-        self.embedding = Embedding(embed_vecs, embed_dropout)
+        self.embedding = Embedding(embed_vecs, embed_dropout, freeze_embed)
         self.encoder = self._get_encoder(embed_vecs.shape[1], encoder_dropout)
         self.attention = self._get_attention()
         self.output = LabelwiseLinearOutput(hidden_dim, num_classes)
@@ -59,6 +60,7 @@ class BiGRULWAN(RNNLWAN):
         rnn_layers (int): The number of recurrent layers. Defaults to 1.
         embed_dropout (float): The dropout rate of the word embedding. Defaults to 0.2.
         encoder_dropout (float): The dropout rate of the encoder output. Defaults to 0.
+        freeze_embed (bool): Whether to keep the word embedding fixed during training. Defaults to False.
     """
 
     def __init__(
@@ -68,13 +70,14 @@ class BiGRULWAN(RNNLWAN):
         rnn_dim=512,
         rnn_layers=1,
         embed_dropout=0.2,
-        encoder_dropout=0
+        encoder_dropout=0,
+        freeze_embed=False
     ):
         self.num_classes = num_classes
         self.rnn_dim = rnn_dim
         self.rnn_layers = rnn_layers
         super(BiGRULWAN, self).__init__(embed_vecs, num_classes, embed_dropout,
-                                        encoder_dropout, rnn_dim)
+                                        encoder_dropout, rnn_dim, freeze_embed)
 
     def _get_encoder(self, input_size, dropout):
         assert self.rnn_dim % 2 == 0, """`rnn_dim` should be even."""
@@ -95,6 +98,7 @@ class BiLSTMLWAN(RNNLWAN):
         rnn_layers (int): The number of recurrent layers. Defaults to 1.
         embed_dropout (float): The dropout rate of the word embedding. Defaults to 0.2.
         encoder_dropout (float): The dropout rate of the encoder output. Defaults to 0.
+        freeze_embed (bool): Whether to keep the word embedding fixed during training. Defaults to False.
     """
 
     def __init__(
@@ -104,13 +108,14 @@ class BiLSTMLWAN(RNNLWAN):
         rnn_dim=512,
         rnn_layers=1,
         embed_dropout=0.2,
-        encoder_dropout=0
+        encoder_dropout=0,
+        freeze_embed=False
     ):
         self.num_classes = num_classes
         self.rnn_dim = rnn_dim
         self.rnn_layers = rnn_layers
         super(BiLSTMLWAN, self).__init__(embed_vecs, num_classes, embed_dropout,
-                                         encoder_dropout, rnn_dim)
+                                         encoder_dropout, rnn_dim, freeze_embed)
 
     def _get_encoder(self, input_size, dropout):
         assert self.rnn_dim % 2 == 0, """`rnn_dim` should be even."""
@@ -133,6 +138,7 @@ class BiLSTMLWMHAN(LabelwiseAttentionNetwork):
         encoder_dropout (float): The dropout rate of the encoder output. Defaults to 0.
         num_heads (int): The number of parallel attention heads. Defaults to 8.
         attention_dropout (float): The dropout rate for the attention. Defaults to 0.0.
+        freeze_embed (bool): Whether to keep the word embedding fixed during training. Defaults to False.
     """
 
     def __init__(
@@ -144,7 +150,8 @@ class BiLSTMLWMHAN(LabelwiseAttentionNetwork):
         embed_dropout=0.2,
         encoder_dropout=0,
         num_heads=8,
-        attention_dropout=0.0
+        attention_dropout=0.0,
+        freeze_embed=False
     ):
         self.num_classes = num_classes
         self.rnn_dim = rnn_dim
@@ -152,7 +159,7 @@ class BiLSTMLWMHAN(LabelwiseAttentionNetwork):
         self.num_heads = num_heads
         self.attention_dropout = attention_dropout
         super(BiLSTMLWMHAN, self).__init__(embed_vecs, num_classes, embed_dropout,
-                                           encoder_dropout, rnn_dim)
+                                           encoder_dropout, rnn_dim, freeze_embed)
 
     def _get_encoder(self, input_size, dropout):
         assert self.rnn_dim % 2 == 0, """`rnn_dim` should be even."""
@@ -165,7 +172,7 @@ class BiLSTMLWMHAN(LabelwiseAttentionNetwork):
     def forward(self, input):
         x = self.embedding(input['text'])  # (batch_size, sequence_length, embed_dim)
         x = self.encoder(x, input['length'])  # (batch_size, sequence_length, hidden_dim)
-        x, _ = self.attention(x, attention_mask=input['text'] == 0)  # (batch_size, num_classes, hidden_dim)
+        x, _ = self.attention(x, attention_mask=input['text'] == 0, need_weights=False)  # (batch_size, num_classes, hidden_dim)
         x = self.output(x)  # (batch_size, num_classes)
         return {'logits': x}
 
@@ -181,6 +188,7 @@ class CNNLWAN(LabelwiseAttentionNetwork):
         embed_dropout (float): The dropout rate of the word embedding. Defaults to 0.2.
         encoder_dropout (float): The dropout rate of the encoder output. Defaults to 0.
         activation (str): Activation function to be used. Defaults to 'tanh'.
+        freeze_embed (bool): Whether to keep the word embedding fixed during training. Defaults to False.
     """
 
     def __init__(
@@ -191,7 +199,8 @@ class CNNLWAN(LabelwiseAttentionNetwork):
         num_filter_per_size=50,
         embed_dropout=0.2,
         encoder_dropout=0,
-        activation='tanh'
+        activation='tanh',
+        freeze_embed=False
     ):
         self.num_classes = num_classes
         self.filter_sizes = filter_sizes
@@ -199,7 +208,7 @@ class CNNLWAN(LabelwiseAttentionNetwork):
         self.activation = activation
         self.hidden_dim = num_filter_per_size * len(filter_sizes)
         super(CNNLWAN, self).__init__(embed_vecs, num_classes, embed_dropout,
-                                      encoder_dropout, self.hidden_dim)
+                                      encoder_dropout, self.hidden_dim, freeze_embed)
 
     def _get_encoder(self, input_size, dropout):
         return CNNEncoder(input_size, self.filter_sizes,
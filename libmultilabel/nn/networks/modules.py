@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 import torch
 import torch.nn as nn
@@ -12,12 +13,14 @@ class Embedding(nn.Module):
     Args:
         embed_vecs (torch.Tensor): The pre-trained word vectors of shape (vocab_size, embed_dim).
         dropout (float): The dropout rate of the word embedding. Defaults to 0.2.
+        freeze (bool): Whether to keep the word vectors fixed during training. A frozen table
+            takes no part in autograd or in the optimizer state. Defaults to False.
     """
 
-    def __init__(self, embed_vecs, dropout=0.2):
+    def __init__(self, embed_vecs, dropout=0.2, freeze=False):
         super(Embedding, self).__init__()
         self.embedding = nn.Embedding.from_pretrained(
-            embed_vecs, freeze=False, padding_idx=0)
+            embed_vecs, freeze=freeze, padding_idx=0)
         self.dropout = nn.Dropout(dropout)
 
     def forward(self, input):
@@ -40,14 +43,15 @@ class RNNEncoder(ABC, nn.Module):
         self.dropout = nn.Dropout(dropout)
 
     def forward(self, input, length, **kwargs):
-        self.rnn.flatten_parameters()
-        idx = torch.argsort(length, descending=True)
-        length_clamped = length[idx].cpu().clamp(min=1)  # avoid the empty text with length 0
+        # nn.RNNBase flattens its weights on construction and whenever the module is moved
+        # with .to() or .cuda(), so there is no need to call flatten_parameters() per step.
+        # `length` is kept on CPU by the model, so .cpu() does not sync with the device.
+        length_clamped = length.cpu().clamp(min=1)  # avoid the empty text with length 0
         packed_input = pack_padded_sequence(
-            input[idx], length_clamped, batch_first=True)
+            input, length_clamped, batch_first=True, enforce_sorted=False)
         outputs, _ = pad_packed_sequence(
             self.rnn(packed_input)[0], batch_first=True)
-        return self.dropout(outputs[torch.argsort(idx)])
+        return self.dropout(outputs)
 
     @abstractmethod
     def _get_rnn(self, input_size, hidden_size, num_layers):
@@ -106,15 +110,20 @@ class CNNEncoder(nn.Module):
                         If num_pool = 1, do typical max-pooling.
                         If num_pool > 1, do adaptive max-pooling.
         channel_last (bool): Whether to transpose the dimension from (batch_size, num_channel, length) to (batch_size, length, num_channel)
+        fuse_filters (bool): Whether to run all filter sizes as a single convolution whose filters are zero-padded
+                             to the largest size. This replaces one convolution per size with one kernel launch at
+                             the cost of extra multiply-adds, which pays off for small batches. Defaults to False.
     """
 
     def __init__(self, input_size, filter_sizes, num_filter_per_size,
-                 activation, dropout=0, num_pool=0, channel_last=False):
+                 activation, dropout=0, num_pool=0, channel_last=False,
+                 fuse_filters=False):
         super(CNNEncoder, self).__init__()
         if not filter_sizes:
             raise ValueError(f'CNNEncoder expect non-empty filter_sizes. '
                              f'Got: {filter_sizes}')
         self.channel_last = channel_last
+        self.fuse_filters = fuse_filters
         self.convs = nn.ModuleList()
         for filter_size in filter_sizes:
             conv = nn.Conv1d(
@@ -126,24 +135,59 @@ class CNNEncoder(nn.Module):
         if num_pool > 1:
             self.pool = nn.AdaptiveMaxPool1d(num_pool)
         self.activation = getattr(torch, activation, getattr(F, activation))
+        self.inplace_activation = getattr(torch, f'{activation}_', None)
         self.dropout = nn.Dropout(dropout)
 
     def forward(self, input):
         h = input.transpose(1, 2)  # (batch_size, input_size, length)
+        if self.fuse_filters and len(self.convs) > 1:
+            conv_outputs = self._fused_conv(h)
+        else:
+            # Materialize the channel-first layout once instead of letting every
+            # convolution copy the strided view on its own.
+            h = h.contiguous()
+            conv_outputs = [conv(h) for conv in self.convs]
         h_list = []
-        for conv in self.convs:
-            h_sub = conv(h)  # (batch_size, num_filter, length)
+        for h_sub in conv_outputs:  # (batch_size, num_filter, length)
             if self.num_pool == 1:
-                h_sub = F.max_pool1d(h_sub, h_sub.shape[2])  # (batch_size, num_filter, 1)
+                h_sub = h_sub.amax(dim=2, keepdim=True)  # (batch_size, num_filter, 1)
             elif self.num_pool > 1:
                 h_sub = self.pool(h_sub)  # (batch_size, num_filter, num_pool)
+            if self.channel_last:
+                h_sub = h_sub.transpose(1, 2)  # (batch_size, *, num_filter)
             h_list.append(h_sub)
-        h = torch.cat(h_list, 1)  # (batch_size, total_num_filter, *)
+        # Concatenating the transposed views writes a contiguous channel-last tensor
+        # directly, so the following layers do not copy a strided view.
         if self.channel_last:
-            h = h.transpose(1, 2)  # (batch_size, *, total_num_filter)
-        h = self.activation(h)
+            h = torch.cat(h_list, 2)  # (batch_size, *, total_num_filter)
+        else:
+            h = torch.cat(h_list, 1)  # (batch_size, total_num_filter, *)
+        # The activation runs after max-pooling on the smallest tensor. cat returns a new
+        # tensor, so the activation can overwrite it in place when an in-place variant exists.
+        if self.inplace_activation is not None:
+            h = self.inplace_activation(h)
+        else:
+            h = self.activation(h)
         return self.dropout(h)
 
+    def _fused_conv(self, input):
+        """Apply all convolutions with one `F.conv1d` call.
+
+        Each filter is zero-padded on the right to the largest filter size. Padding
+        the input on the right by (max_size - min_size) then makes the first
+        length - filter_size + 1 outputs of each filter group identical to those
+        of the separate convolution.
+        """
+        filter_sizes = [conv.kernel_size[0] for conv in self.convs]
+        max_size = max(filter_sizes)
+        weight = torch.cat([F.pad(conv.weight, (0, max_size - filter_size))
+                            for conv, filter_size in zip(self.convs, filter_sizes)])
+        bias = torch.cat([conv.bias for conv in self.convs])
+        h = F.conv1d(F.pad(input, (0, max_size - min(filter_sizes))), weight, bias)
+        length = input.shape[2]
+        return [h_sub.narrow(2, 0, length - filter_size + 1)
+                for h_sub, filter_size in zip(h.split(self.convs[0].out_channels, dim=1), filter_sizes)]
+
 
 class LabelwiseAttention(nn.Module):
     """Applies attention technique to summarize the sequence for each label
@@ -158,9 +202,11 @@ class LabelwiseAttention(nn.Module):
         self.attention = nn.Linear(input_size, num_classes, bias=False)
 
     def forward(self, input):
-        attention = self.attention(input).transpose(1, 2)  # (batch_size, num_classes, sequence_length)
+        # Contract the hidden dimension with the label vectors directly so the scores come out
+        # contiguous in (batch_size, num_classes, sequence_length) for the softmax.
+        attention = torch.matmul(self.attention.weight, input.transpose(1, 2))  # (batch_size, num_classes, sequence_length)
         attention = F.softmax(attention, -1)
-        logits = torch.bmm(attention, input)  # (batch_size, num_classes, hidden_dim)
+        logits = torch.matmul(attention, input)  # (batch_size, num_classes, hidden_dim)
         return logits, attention
 
 
@@ -173,19 +219,61 @@ class LabelwiseMultiHeadAttention(nn.Module):
         num_heads (int): The number of parallel attention heads.
         attention_dropout (float): The dropout rate for the attention. Defaults to 0.0.
     """
+    __constants__ = ['use_sdpa']
+    # F.scaled_dot_product_attention is available from torch 2.0.
+    use_sdpa = hasattr(F, 'scaled_dot_product_attention')
+
     def __init__(self, input_size, num_classes, num_heads, attention_dropout=0.0):
         super(LabelwiseMultiHeadAttention, self).__init__()
-        self.attention = nn.MultiheadAttention(embed_dim=input_size, num_heads=num_heads, dropout=attention_dropout)
+        self.attention = nn.MultiheadAttention(embed_dim=input_size, num_heads=num_heads, dropout=attention_dropout,
+                                               batch_first=True)
         self.Q = nn.Linear(input_size, num_classes)
 
-    def forward(self, input, attention_mask=None):
-        key = value = input.permute(1, 0, 2)  # (sequence_length, batch_size, hidden_dim)
-        query = self.Q.weight.repeat(input.size(0), 1, 1).transpose(
-            0, 1)  # (num_classes, batch_size, hidden_dim)
+    def forward(self, input, attention_mask: Optional[torch.Tensor] = None, need_weights: bool = True):
+        # A constant condition, so TorchScript does not compile the SDPA path on older torch.
+        if self.use_sdpa:
+            if not need_weights:
+                return self._scaled_dot_product_attention(input, attention_mask), None
+
+        key = value = input  # (batch_size, sequence_length, hidden_dim)
+        query = self.Q.weight.unsqueeze(0).expand(
+            input.size(0), -1, -1)  # (batch_size, num_classes, hidden_dim)
 
         logits, attention = self.attention(query, key, value, key_padding_mask=attention_mask)
-        logits = logits.permute(1, 0, 2)  # (batch_size, num_classes, hidden_dim)
-        return logits, attention
+        return logits, attention  # (batch_size, num_classes, hidden_dim)
+
+    def _scaled_dot_product_attention(self, input, attention_mask: Optional[torch.Tensor] = None):
+        """Same as `self.attention` but without the attention weights, which lets
+        `F.scaled_dot_product_attention` use the flash or memory-efficient kernels.
+        """
+        batch_size, sequence_length, hidden_dim = input.shape
+        num_heads = self.attention.num_heads
+        head_dim = hidden_dim // num_heads
+        w_q, w_k, w_v = self.attention.in_proj_weight.chunk(3)
+        b_q, b_k, b_v = self.attention.in_proj_bias.chunk(3)
+
+        # The label queries do not depend on the input, so project them once for the whole batch.
+        query = F.linear(self.Q.weight, w_q, b_q).view(1, -1, num_heads, head_dim).transpose(1, 2)
+        query = query.expand(batch_size, -1, -1, -1)  # (batch_size, num_heads, num_classes, head_dim)
+        key = F.linear(input, w_k, b_k).view(batch_size, sequence_length, num_heads, head_dim).transpose(1, 2)
+        value = F.linear(input, w_v, b_v).view(batch_size, sequence_length, num_heads, head_dim).transpose(1, 2)
+
+        empty_rows: Optional[torch.Tensor] = None
+        if attention_mask is not None:
+            empty_rows = attention_mask.all(dim=1)
+            # an additive float mask keeps the fused kernels available
+            attention_mask = torch.zeros(attention_mask.shape, dtype=query.dtype, device=query.device) \
+                .masked_fill_(attention_mask, float('-inf'))[:, None, None, :]
+        logits = F.scaled_dot_product_attention(
+            query, key, value, attn_mask=attention_mask,
+            dropout_p=self.attention.dropout if self.training else 0.0)
+        logits = logits.transpose(1, 2).reshape(batch_size, -1, hidden_dim)
+        logits = self.attention.out_proj(logits)  # (batch_size, num_classes, hidden_dim)
+        if empty_rows is not None:
+            # Some SDPA kernels return zeros for fully masked rows, while nn.MultiheadAttention
+            # returns NaN. Use NaN so that the output does not depend on the code path.
+            logits = logits.masked_fill(empty_rows[:, None, None], float('nan'))
+        return logits
 
 
 class LabelwiseLinearOutput(nn.Module):
@@ -201,4 +289,5 @@ class LabelwiseLinearOutput(nn.Module):
         self.output = nn.Linear(input_size, num_classes)
 
     def forward(self, input):
-        return (self.output.weight * input).sum(dim=-1) + self.output.bias
+        # contract the hidden dimension without materializing the (batch_size, num_classes, input_size) product
+        return torch.einsum('bnd,nd->bn', input, self.output.weight) + self.output.bias
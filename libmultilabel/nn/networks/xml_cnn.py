@@ -18,6 +18,8 @@ class XMLCNN(nn.Module):
         num_filter_per_size (int): The number of filters in convolutional layers in each size. Defaults to 256.
         num_pool (int): The number of pool for dynamic max-pooling. Defaults to 2.
         activation (str): Activation function to be used. Defaults to 'relu'.
+        freeze_embed (bool): Whether to keep the word embedding fixed during training. Defaults to False.
+        fuse_filters (bool): Whether to run all filter sizes as a single convolution. Defaults to False.
     """
     def __init__(
         self,
@@ -29,13 +31,15 @@ class XMLCNN(nn.Module):
         hidden_dim=512,
         num_filter_per_size=256,
         num_pool=2,
-        activation='relu'
+        activation='relu',
+        freeze_embed=False,
+        fuse_filters=False
     ):
         super(XMLCNN, self).__init__()
-        self.embedding = Embedding(embed_vecs, embed_dropout)
+        self.embedding = Embedding(embed_vecs, embed_dropout, freeze_embed)
         self.encoder = CNNEncoder(embed_vecs.shape[1], filter_sizes,
                                   num_filter_per_size, activation,
-                                  num_pool=num_pool)
+                                  num_pool=num_pool, fuse_filters=fuse_filters)
         total_output_size = len(filter_sizes) * num_filter_per_size * num_pool
         self.dropout = nn.Dropout(hidden_dropout)
         self.linear1 = nn.Linear(total_output_size, hidden_dim)
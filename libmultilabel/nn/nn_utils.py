@@ -9,6 +9,7 @@ from pytorch_lightning.utilities.seed import seed_everything
 
 from ..nn import networks
 from ..nn.model import Model
+from ..nn.networks.modules import RNNEncoder
 
 
 def init_device(use_cpu=False):
@@ -48,7 +49,8 @@ def init_model(model_name,
                metric_threshold=0.5,
                monitor_metrics=None,
                silent=False,
-               save_k_predictions=0):
+               save_k_predictions=0,
+               compile_heads=False):
     """Initialize a `Model` class for initializing and training a neural network.
 
     Args:
@@ -69,6 +71,8 @@ def init_model(model_name,
         monitor_metrics (list, optional): Metrics to monitor while validating. Defaults to None.
         silent (bool, optional): Enable silent mode. Defaults to False.
         save_k_predictions (int, optional): Save top k predictions on test set. Defaults to 0.
+        compile_heads (bool, optional): Compile the label-wise attention and output layers
+            with `torch.compile`. Defaults to False.
 
     Returns:
         Model: A class that implements `MultiLabelModel` for initializing and training a neural network.
@@ -85,6 +89,9 @@ def init_model(model_name,
             init_weight=init_weight)
         network.apply(init_weight)
 
+    if compile_heads:
+        networks.compile_label_heads(network)
+
     model = Model(
         classes=classes,
         word_dict=word_dict,
@@ -114,7 +121,8 @@ def init_trainer(checkpoint_dir,
                  limit_val_batches=1.0,
                  limit_test_batches=1.0,
                  search_params=False,
-                 save_checkpoints=True):
+                 save_checkpoints=True,
+                 precision=32):
     """Initialize a torch lightning trainer.
 
     Args:
@@ -131,11 +139,18 @@ def init_trainer(checkpoint_dir,
         search_params (bool): Enable pytorch-lightning trainer to report the results to ray tune
             on validation end during hyperparameter search. Defaults to False.
         save_checkpoints (bool): Whether to save the last and the best checkpoint or not. Defaults to True.
+        precision (Union[int, str]): Training precision passed to the trainer: 16, 32, or 'bf16', where the
+            numbers may also be given as strings. 16 and 'bf16' run the network under autocast, which halves
+            the memory traffic of large label-wise layers. Defaults to 32.
 
     Returns:
         pl.Trainer: A torch lightning trainer.
     """
 
+    # Lightning takes the numeric precisions as integers.
+    if precision != 'bf16':
+        precision = int(precision)
+
     # Set strict to False to prevent EarlyStopping from crashing the training if no validation data are provided
     callbacks = [EarlyStopping(patience=patience, monitor=val_metric, mode=mode, strict=False)]
     if save_checkpoints:
@@ -154,10 +169,49 @@ def init_trainer(checkpoint_dir,
                          limit_train_batches=limit_train_batches,
                          limit_val_batches=limit_val_batches,
                          limit_test_batches=limit_test_batches,
+                         precision=precision,
                          deterministic=True)
     return trainer
 
 
+class _LogitsNetwork(torch.nn.Module):
+    """Map token ids to logits so that the network has tensor inputs and outputs."""
+
+    def __init__(self, network):
+        super().__init__()
+        self.network = network
+
+    def forward(self, text):
+        return self.network({'text': text})['logits']
+
+
+def export_onnx(network, onnx_path, max_seq_length=500, opset_version=17):
+    """Export a network to ONNX for inference runtimes such as ONNX Runtime or TensorRT.
+
+    The exported graph takes `text` of shape (batch_size, length) and returns `logits`
+    of shape (batch_size, num_classes), with dynamic batch size and length. RNN networks
+    are not supported because packed sequences cannot be exported, and adaptive
+    max-pooling (XMLCNN) is only exported for a fixed length.
+
+    Args:
+        network (nn.Module): The network to export. It is set to evaluation mode.
+        onnx_path (str): Path to the output ONNX file.
+        max_seq_length (int, optional): The length of the example input used for tracing. Defaults to 500.
+        opset_version (int, optional): The ONNX opset version. Defaults to 17.
+    """
+    if any(isinstance(m, RNNEncoder) for m in network.modules()):
+        raise ValueError('RNN networks cannot be exported to ONNX.')
+    model = _LogitsNetwork(network).eval()
+    device = next(network.parameters()).device
+    dummy_text = torch.ones(2, max_seq_length, dtype=torch.long, device=device)
+    torch.onnx.export(model, (dummy_text,), onnx_path,
+                      input_names=['text'], output_names=['logits'],
+                      dynamic_axes={'text': {0: 'batch_size', 1: 'length'},
+                                    'logits': {0: 'batch_size'}},
+                      opset_version=opset_version)
+    logging.info(f'Exported the network to {onnx_path}.')
+
+
 def set_seed(seed):
     """Set seeds for numpy and pytorch.
 
@@ -170,3 +224,4 @@ def set_seed(seed):
             seed_everything(seed=seed, workers=True)
         else:
             logging.warning('the random seed should be a non-negative integer')
+
@@ -33,6 +33,8 @@ def add_all_arguments(parser):
                         help='Pretrained model name or path (default: %(default)s)')
     parser.add_argument('--shuffle', type=bool, default=True,
                         help='Whether to shuffle training data before each epoch (default: %(default)s)')
+    parser.add_argument('--bucket_by_length', action='store_true',
+                        help='Batch training samples of similar lengths together to reduce padding (default: %(default)s)')
     parser.add_argument('--merge_train_val', action='store_true',
                         help='Whether to merge the training and validation data. (default: %(default)s)')
     parser.add_argument('--include_test_labels', action='store_true',
@@ -113,6 +115,12 @@ def add_all_arguments(parser):
                         help='Only run evaluation on the test set (default: %(default)s)')
     parser.add_argument('--checkpoint_path',
                         help='The checkpoint to warm-up with (default: %(default)s)')
+    parser.add_argument('--precision', default='32', choices=['16', '32', 'bf16'],
+                        help='Training precision. 16 and bf16 use mixed precision with autocast (default: %(default)s)')
+    parser.add_argument('--compile_heads', action='store_true',
+                        help='Compile the label-wise attention and output layers with torch.compile (default: %(default)s)')
+    parser.add_argument('--jit_heads', action='store_true',
+                        help='Script the label-wise attention and output layers with TorchScript before testing (default: %(default)s)')
 
     # linear options
     parser.add_argument('--linear', action='store_true',
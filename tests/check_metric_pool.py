@@ -0,0 +1,62 @@
+import argparse
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from libmultilabel.linear.metrics import get_metrics
+
+# A single top-k metric, so that RPrecision runs the Numba kernel instead of shared indices.
+METRICS = ['RP@5', 'Macro-F1', 'Micro-F1']
+
+
+def run_metrics(force_pool):
+    """Evaluate the metrics on random data, optionally forcing the thread pool."""
+    rng = np.random.default_rng(0)
+    metrics = get_metrics(0.5, METRICS, num_classes=50)
+    if force_pool:
+        metrics._num_workers = 2
+        metrics.parallel_threshold = 0
+    for _ in range(3):
+        preds = rng.random((32, 50))
+        target = (rng.random((32, 50)) < 0.1).astype(np.int64)
+        metrics.update(preds, target)
+    return metrics.compute()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Check that MetricCollection updates in the thread pool finish and match sequential updates.')
+    parser.add_argument('--threading_layers', nargs='+', default=['tbb', 'workqueue', 'omp'],
+                        help='Numba threading layers to check (default: %(default)s)')
+    parser.add_argument('--timeout', type=int, default=60,
+                        help='Seconds before a run is considered hung (default: %(default)s)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # The pooled run goes first: TBB only hangs when a worker thread is the first
+        # to launch the Numba kernel.
+        actual = run_metrics(force_pool=True)
+        expected = run_metrics(force_pool=False)
+        sys.exit(0 if all(np.isclose(expected[k], actual[k]) for k in METRICS) else 1)
+
+    # Numba may hang at interpreter exit rather than in update(), so each layer
+    # runs in its own process.
+    for layer in args.threading_layers:
+        env = dict(os.environ, NUMBA_THREADING_LAYER=layer)
+        try:
+            ret = subprocess.run([sys.executable, __file__, '--child'], env=env,
+                                 timeout=args.timeout, capture_output=True)
+            status = 'PASSED' if ret.returncode == 0 else 'FAILED'
+        except subprocess.TimeoutExpired:
+            status = 'FAILED (timed out)'
+        print(layer, status)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,7 +5,7 @@ import numpy as np
 from pytorch_lightning.callbacks.model_checkpoint import ModelCheckpoint
 from transformers import AutoTokenizer
 
-from libmultilabel.nn import data_utils
+from libmultilabel.nn import data_utils, networks
 from libmultilabel.nn.model import Model
 from libmultilabel.nn.nn_utils import init_device, init_model, init_trainer, set_seed
 from libmultilabel.common_utils import dump_log
@@ -79,7 +79,8 @@ class TorchTrainer:
                                     limit_val_batches=config.limit_val_batches,
                                     limit_test_batches=config.limit_test_batches,
                                     search_params=search_params,
-                                    save_checkpoints=save_checkpoints)
+                                    save_checkpoints=save_checkpoints,
+                                    precision=config.get('precision', 32))
         callbacks = [callback for callback in self.trainer.callbacks if isinstance(callback, ModelCheckpoint)]
         self.checkpoint_callback = callbacks[0] if callbacks else None
 
@@ -112,6 +113,9 @@ class TorchTrainer:
         if checkpoint_path is not None:
             logging.info(f'Loading model from `{checkpoint_path}`...')
             self.model = Model.load_from_checkpoint(checkpoint_path)
+            # Compiled modules are pickled without their compiled forward, so compile them again.
+            if self.config.get('compile_heads', False):
+                networks.compile_label_heads(self.model.network)
         else:
             logging.info('Initialize model from scratch.')
             if self.config.embed_file is not None:
@@ -148,7 +152,8 @@ class TorchTrainer:
                                     metric_threshold=self.config.metric_threshold,
                                     monitor_metrics=self.config.monitor_metrics,
                                     silent=self.config.silent,
-                                    save_k_predictions=self.config.save_k_predictions
+                                    save_k_predictions=self.config.save_k_predictions,
+                                    compile_heads=self.config.get('compile_heads', False)
                                    )
 
     def _get_dataset_loader(self, split, shuffle=False):
@@ -171,7 +176,8 @@ class TorchTrainer:
             shuffle=shuffle,
             data_workers=self.config.data_workers,
             tokenizer=self.tokenizer,
-            add_special_tokens=self.config.add_special_tokens
+            add_special_tokens=self.config.add_special_tokens,
+            bucket_by_length=self.config.get('bucket_by_length', False) and split == 'train'
         )
 
     def train(self):
@@ -210,6 +216,9 @@ class TorchTrainer:
         """
         assert 'test' in self.datasets and self.trainer is not None
 
+        if self.config.get('jit_heads', False):
+            networks.script_label_heads(self.model.network)
+
         logging.info(f'Testing on {split} set.')
         test_loader = self._get_dataset_loader(split=split)
         metric_dict = self.trainer.test(self.model, dataloaders=test_loader)[0]